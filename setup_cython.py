@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Optional Cython build for the field tree traversal
+Usage: python setup_cython.py build_ext --inplace
+
+The scripts import src/field_walker.py as plain Python when this
+has not been run; the compiled extension built next to it in src/
+is picked up instead once it exists.
+"""
+
+from setuptools import Extension, setup
+from Cython.Build import cythonize
+
+setup(
+    name="va-form-field-walker",
+    package_dir={"": "src"},
+    ext_modules=cythonize(
+        [Extension("field_walker", ["src/field_walker.py"])],
+        compiler_directives={
+            "language_level": 3,
+            "boundscheck": False,
+            "wraparound": False,
+        },
+    ),
+)
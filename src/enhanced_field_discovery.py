@@ -6,36 +6,11 @@ Handles hierarchical fields and Unicode field names
 
 import sys
 import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pdfrw import PdfReader
-import json
-
-def decode_unicode_field_name(field_name_obj):
-    """
-    Decode Unicode field names that appear as <FEFF...>
-    """
-    field_str = str(field_name_obj)
-    
-    # Handle Unicode encoded field names
-    if field_str.startswith('<FEFF') and field_str.endswith('>'):
-        # Extract hex content
-        hex_content = field_str[5:-1]  # Remove <FEFF and >
-        
-        try:
-            # Convert hex pairs to characters
-            decoded = ""
-            for i in range(0, len(hex_content), 4):
-                hex_char = hex_content[i:i+4]
-                char_code = int(hex_char, 16)
-                decoded += chr(char_code)
-            return decoded
-        except:
-            return field_str
-    
-    # Handle regular parentheses format
-    if field_str.startswith('(') and field_str.endswith(')'):
-        return field_str[1:-1]
-    
-    return field_str
+from field_walker import walk
+from json_utils import write_json_records
 
 def discover_pdf_fields_enhanced(pdf_path):
     """
@@ -45,7 +20,9 @@ def discover_pdf_fields_enhanced(pdf_path):
     print(f"📄 Analyzing: {pdf_path}")
     
     try:
-        pdf = PdfReader(pdf_path)
+        # Objects are resolved lazily on attribute access; keep streams compressed
+        # since only the /AcroForm subtree is read
+        pdf = PdfReader(pdf_path, decompress=False)
         print(f"✅ PDF loaded successfully - {len(pdf.pages)} pages")
         
         fields_info = []
@@ -62,8 +39,10 @@ def discover_pdf_fields_enhanced(pdf_path):
         print(f"📋 Found {len(form.Fields)} top-level form fields")
         
         # Analyze each top-level field and its children
-        for i, field in enumerate(form.Fields):
-            analyze_field_recursive(field, fields_info, level=0, parent_name="")
+        log_lines = []
+        analyze_field_tree(form.Fields, fields_info, log_lines)
+        if log_lines:
+            sys.stdout.write("\n".join(log_lines) + "\n")
                 
         return fields_info
         
@@ -71,64 +50,46 @@ def discover_pdf_fields_enhanced(pdf_path):
         print(f"❌ Error reading PDF: {e}")
         return None
 
-def analyze_field_recursive(field, fields_info, level=0, parent_name=""):
+def analyze_field_tree(root_fields, fields_info, log_lines):
     """
-    Recursively analyze fields and their children
+    Analyze fields and their children into field_info records
+    
+    Progress lines are appended to log_lines for the caller to write in one go
     """
-    try:
-        # Decode field name
-        if field.T:
-            field_name = decode_unicode_field_name(field.T)
-        else:
-            field_name = f"unnamed_field_{len(fields_info)}"
-        
-        # Build full field path
-        if parent_name:
-            full_name = f"{parent_name}.{field_name}"
-        else:
-            full_name = field_name
-        
+    for node in walk(root_fields, emit=log_lines.append):
         field_info = {
-            "level": level,
-            "parent": parent_name,
-            "field_name": field_name,
-            "full_path": full_name,
-            "field_type": str(field.FT) if field.FT else "Unknown",
-            "field_flags": str(field.Ff) if field.Ff else "None",
-            "default_value": str(field.DV) if field.DV else "",
-            "current_value": str(field.V) if field.V else "",
-            "max_length": str(field.MaxLen) if field.MaxLen else "No limit",
-            "has_children": bool(field.Kids),
-            "child_count": len(field.Kids) if field.Kids else 0
+            "level": node.level,
+            "parent": node.parent_name,
+            "field_name": node.field_name,
+            "full_path": node.full_path,
+            "field_type": node.field_type,
+            "field_flags": node.field_flags,
+            "default_value": node.default_value,
+            "current_value": node.current_value,
+            "max_length": node.max_length,
+            "has_children": node.n_kids > 0,
+            "child_count": node.n_kids
         }
         
-        # Add to fields list
-        fields_info.append(field_info)
-        
-        # Print discovery progress
-        indent = "  " * level
-        print(f"{indent}🔸 {full_name} (Type: {field_info['field_type']}, Children: {field_info['child_count']})")
-        
-        # Special handling for different field types
-        if field.FT == '/Btn':  # Button field
-            if field.Kids:
-                field_info["button_type"] = "Radio Button Group"
-                field_info["options"] = []
-            else:
-                field_info["button_type"] = "Checkbox"
-                
-        elif field.FT == '/Ch':  # Choice field
-            field_info["field_type"] = "Choice Field"
-            if field.Opt:
-                field_info["options"] = [str(opt) for opt in field.Opt]
+        try:
+            # Special handling for different field types
+            if node.field_type == '/Btn':  # Button field
+                if node.n_kids:
+                    field_info["button_type"] = "Radio Button Group"
+                    field_info["options"] = []
+                else:
+                    field_info["button_type"] = "Checkbox"
+            
+            elif node.field_type == '/Ch':  # Choice field
+                field_info["field_type"] = "Choice Field"
+                options = node.field.Opt
+                if options:
+                    field_info["options"] = [str(opt) for opt in options]
+            
+        except Exception as e:
+            log_lines.append(f"⚠️ Error analyzing field at level {node.level}: {e}")
         
-        # Recursively process children
-        if field.Kids:
-            for child in field.Kids:
-                analyze_field_recursive(child, fields_info, level + 1, full_name)
-                
-    except Exception as e:
-        print(f"⚠️ Error analyzing field at level {level}: {e}")
+        fields_info.append(field_info)
 
 def print_enhanced_summary(fields_info):
     """
@@ -139,12 +100,9 @@ def print_enhanced_summary(fields_info):
     print("="*80)
     
     # Organize by hierarchy level
-    levels = {}
+    levels = defaultdict(list)
     for field in fields_info:
-        level = field['level']
-        if level not in levels:
-            levels[level] = []
-        levels[level].append(field)
+        levels[field['level']].append(field)
     
     print(f"\n📈 Total Fields Discovered: {len(fields_info)}")
     print(f"📊 Hierarchy Levels: {len(levels)}")
@@ -154,8 +112,8 @@ def print_enhanced_summary(fields_info):
         fields_at_level = levels[level]
         print(f"\n🔸 Level {level} Fields ({len(fields_at_level)}):")
         
+        indent = "  " * (level + 1)
         for field in fields_at_level:
-            indent = "  " * (level + 1)
             field_type = field['field_type']
             if field.get('button_type'):
                 field_type += f" ({field['button_type']})"
@@ -170,8 +128,11 @@ def print_enhanced_summary(fields_info):
     # Look for specific field patterns
     print(f"\n🔍 FIELD PATTERN ANALYSIS:")
     
+    # Lowercase each name once for the keyword filters
+    names_lc = [f['field_name'].lower() for f in fields_info]
+    
     # Email fields
-    email_fields = [f for f in fields_info if 'email' in f['field_name'].lower() or 'mail' in f['field_name'].lower()]
+    email_fields = [f for f, name in zip(fields_info, names_lc) if 'email' in name or 'mail' in name]
     if email_fields:
         print(f"\n📧 Email Fields ({len(email_fields)}):")
         for field in email_fields:
@@ -203,10 +164,12 @@ def main():
     Main function with enhanced discovery
     """
     if len(sys.argv) < 2:
-        print("Usage: python enhanced_field_discovery.py <path_to_blank_pdf>")
+        print("Usage: python enhanced_field_discovery.py <path_to_blank_pdf> [--compact]")
         return
     
     pdf_path = sys.argv[1]
+    # Compact JSON (no indentation or spaces) for machine-consumed output
+    compact = "--compact" in sys.argv[2:]
     
     if not os.path.exists(pdf_path):
         print(f"❌ File not found: {pdf_path}")
@@ -216,12 +179,13 @@ def main():
     fields_info = discover_pdf_fields_enhanced(pdf_path)
     
     if fields_info:
-        print_enhanced_summary(fields_info)
-        
-        # Save detailed mapping
+        # Save detailed mapping on a worker thread while the summary prints;
+        # the summary only reads fields_info
         output_path = "data/enhanced_field_mapping.json"
-        with open(output_path, 'w') as f:
-            json.dump(fields_info, f, indent=2)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            saved = pool.submit(write_json_records, fields_info, output_path, not compact)
+            print_enhanced_summary(fields_info)
+        saved.result()
         print(f"\n💾 Enhanced field mapping saved to: {output_path}")
         
         print(f"\n🎯 Key Findings:")
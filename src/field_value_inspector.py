@@ -6,29 +6,24 @@ This will reveal the email overflow pattern and checkbox values
 
 import sys
 import os
-from pdfrw import PdfReader
-import json
+from multiprocessing import Pool
+import pymupdf
+from json_utils import write_json
 
-def decode_unicode_field_name(field_name_obj):
-    """Decode Unicode field names"""
-    field_str = str(field_name_obj)
-    
-    if field_str.startswith('<FEFF') and field_str.endswith('>'):
-        hex_content = field_str[5:-1]
-        try:
-            decoded = ""
-            for i in range(0, len(hex_content), 4):
-                hex_char = hex_content[i:i+4]
-                char_code = int(hex_char, 16)
-                decoded += chr(char_code)
-            return decoded
-        except:
-            return field_str
-    
-    if field_str.startswith('(') and field_str.endswith(')'):
-        return field_str[1:-1]
-    
-    return field_str
+# PyMuPDF reports widget types by name; map them back to the PDF /FT
+# values the analysis and filled_field_values.json have always used
+WIDGET_FIELD_TYPES = {
+    "Button": "/Btn",
+    "CheckBox": "/Btn",
+    "RadioButton": "/Btn",
+    "Text": "/Tx",
+    "ComboBox": "/Ch",
+    "ListBox": "/Ch",
+    "Signature": "/Sig",
+}
+
+# Below this many pages starting worker processes costs more than it saves
+PARALLEL_PAGE_THRESHOLD = 8
 
 def extract_field_values(pdf_path):
     """Extract field names AND their current values"""
@@ -36,76 +31,60 @@ def extract_field_values(pdf_path):
     print(f"📄 Analyzing: {pdf_path}")
     
     try:
-        pdf = PdfReader(pdf_path)
-        print(f"✅ PDF loaded successfully - {len(pdf.pages)} pages")
-        
-        field_values = {}
-        
-        if pdf.Root.AcroForm is None:
-            print("❌ No form fields found")
-            return None
+        with pymupdf.open(pdf_path) as doc:
+            print(f"✅ PDF loaded successfully - {doc.page_count} pages")
             
-        form = pdf.Root.AcroForm
-        if form.Fields is None:
-            print("❌ No Fields found in AcroForm")
-            return None
+            field_values = {}
             
-        print(f"📋 Found {len(form.Fields)} top-level fields")
-        
-        # Extract all field values recursively
-        extract_values_recursive(form.Fields, field_values, "")
-        
-        return field_values
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        return None
-
-def extract_values_recursive(fields, field_values, parent_path):
-    """Recursively extract field names and values"""
-    
-    for field in fields:
-        try:
-            # Get field name
-            if field.T:
-                field_name = decode_unicode_field_name(field.T)
-            else:
-                field_name = f"unnamed_{len(field_values)}"
+            if not doc.is_form_pdf:
+                print("❌ No form fields found")
+                return None
             
-            # Build full path
-            if parent_path:
-                full_path = f"{parent_path}.{field_name}"
+            # Widgets are page-local, so large documents are split across processes
+            if doc.page_count >= PARALLEL_PAGE_THRESHOLD:
+                with Pool() as pool:
+                    pages = pool.map(extract_page_widgets, [(pdf_path, pno) for pno in range(doc.page_count)])
             else:
-                full_path = field_name
+                pages = [[extract_widget_value(widget) for widget in page.widgets()] for page in doc]
             
-            # Get field value
-            field_value = ""
-            if field.V:
-                field_value = str(field.V)
-                # Clean up value format
-                if field_value.startswith('(') and field_value.endswith(')'):
-                    field_value = field_value[1:-1]
+            # Widgets carry their fully qualified, already-decoded field name
+            for page_fields in pages:
+                for field_info in page_fields:
+                    field_values[field_info["full_path"]] = field_info
             
-            # Get field type
-            field_type = str(field.FT) if field.FT else "Unknown"
+            print(f"📋 Found {len(field_values)} fields with widgets")
             
-            # Store field info
-            field_info = {
-                "full_path": full_path,
-                "field_type": field_type,
-                "current_value": field_value,
-                "has_value": bool(field_value),
-                "max_length": str(field.MaxLen) if field.MaxLen else "No limit"
-            }
-            
-            field_values[full_path] = field_info
-            
-            # Process children if they exist
-            if field.Kids:
-                extract_values_recursive(field.Kids, field_values, full_path)
-                
-        except Exception as e:
-            print(f"⚠️ Error processing field: {e}")
+            return field_values
+        
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return None
+
+def extract_page_widgets(args):
+    """Extract widget values from one page (runs in a worker process)"""
+    pdf_path, page_number = args
+    with pymupdf.open(pdf_path) as doc:
+        return [extract_widget_value(widget) for widget in doc[page_number].widgets()]
+
+def extract_widget_value(widget):
+    """Extract the field name and value of a single widget"""
+    field_type = WIDGET_FIELD_TYPES.get(widget.field_type_string, "Unknown")
+    
+    # Get field value
+    field_value = widget.field_value or ""
+    if not isinstance(field_value, str):
+        field_value = str(field_value)
+    # Button states are PDF names - keep the /1, /Off form used everywhere else
+    if field_type == "/Btn" and field_value:
+        field_value = f"/{field_value}"
+    
+    return {
+        "full_path": widget.field_name,
+        "field_type": field_type,
+        "current_value": field_value,
+        "has_value": bool(field_value),
+        "max_length": sys.intern(str(widget.text_maxlen)) if widget.text_maxlen else "No limit"
+    }
 
 def analyze_field_values(field_values):
     """Analyze the extracted field values for patterns"""
@@ -125,7 +104,19 @@ def analyze_field_values(field_values):
     print(f"\n🔍 FIELDS WITH ACTUAL VALUES:")
     print("-" * 60)
     
+    # Sort once and bucket the pattern groups in the same pass
+    email_fields = []
+    checkbox_fields = []
+    button_fields = []
+    
     for field_path, info in sorted(filled_fields.items()):
+        if "EMAIL_ADDRESS" in field_path:
+            email_fields.append((field_path, info))
+        if "COMPENSATION" in field_path or "PENSION" in field_path or "SURVIVORS" in field_path:
+            checkbox_fields.append((field_path, info))
+        if info["field_type"] == "/Btn":
+            button_fields.append((field_path, info))
+        
         field_type = info["field_type"]
         value = info["current_value"]
         max_len = info["max_length"]
@@ -141,25 +132,21 @@ def analyze_field_values(field_values):
     print("-" * 40)
     
     # Email fields analysis
-    email_fields = {k: v for k, v in filled_fields.items() if "EMAIL_ADDRESS" in k}
     if email_fields:
         print("\n📧 EMAIL FIELD VALUES:")
-        for field_path, info in sorted(email_fields.items()):
+        for field_path, info in email_fields:
             print(f"   {field_path}: '{info['current_value']}'")
     
     # Checkbox analysis
-    checkbox_fields = {k: v for k, v in filled_fields.items() if 
-                      "COMPENSATION" in k or "PENSION" in k or "SURVIVORS" in k}
     if checkbox_fields:
         print("\n☑️ CHECKBOX FIELD VALUES:")
-        for field_path, info in sorted(checkbox_fields.items()):
+        for field_path, info in checkbox_fields:
             print(f"   {field_path}: '{info['current_value']}'")
     
     # Button/Radio analysis
-    button_fields = {k: v for k, v in filled_fields.items() if info["field_type"] == "/Btn"}
     if button_fields:
         print("\n🔘 BUTTON FIELD VALUES:")
-        for field_path, info in sorted(button_fields.items()):
+        for field_path, info in button_fields:
             print(f"   {field_path}: '{info['current_value']}'")
     
     return filled_fields
@@ -167,10 +154,12 @@ def analyze_field_values(field_values):
 def main():
     """Main function"""
     if len(sys.argv) < 2:
-        print("Usage: python field_value_inspector.py <path_to_filled_pdf>")
+        print("Usage: python field_value_inspector.py <path_to_filled_pdf> [--compact]")
         return
     
     pdf_path = sys.argv[1]
+    # Compact JSON (no indentation or spaces) for machine-consumed output
+    compact = "--compact" in sys.argv[2:]
     
     if not os.path.exists(pdf_path):
         print(f"❌ File not found: {pdf_path}")
@@ -185,8 +174,7 @@ def main():
         
         # Save to JSON for reference
         output_path = "data/filled_field_values.json"
-        with open(output_path, 'w') as f:
-            json.dump(field_values, f, indent=2)
+        write_json(field_values, output_path, pretty=not compact)
         print(f"\n💾 Field values saved to: {output_path}")
         
         print(f"\n🎯 KEY INSIGHTS:")
@@ -0,0 +1,108 @@
+"""
+AcroForm field tree traversal shared by the VA Form 21-0966 PDF scripts
+Plain Python; setup_cython.py can compile it in place for speed
+"""
+
+import sys
+from collections import namedtuple
+from pdf_text_utils import decode_unicode_field_name
+
+# Progress line template and indents, built once instead of per node
+_FIELD_ROW_FMT = "%s🔸 %s (Type: %s, Children: %d)"
+_INDENTS = ["  " * i for i in range(16)]
+
+# One traversed field: the pdfrw object, where it sits in the tree, and its
+# stringified attributes (name is the raw /T, or None when missing)
+FieldNode = namedtuple("FieldNode", [
+    "field", "index", "level", "parent_name", "name", "field_name", "full_path",
+    "field_type", "field_flags", "default_value", "current_value", "max_length",
+    "kids", "n_kids",
+])
+
+def pull_field_attrs(field, _str=str, _intern=sys.intern):
+    """
+    Fetch the per-node attributes once each, stringified with their defaults
+    
+    Returns (name, field_type, field_flags, default_value, current_value,
+    max_length, kids); name is None when the field has no /T. Type, flags
+    and max length come from a handful of values (/Tx, /Btn, 25165824, ...)
+    so they are interned and shared by every record instead of copied.
+    """
+    t, ft, ff, dv, v, max_len, kids = field.T, field.FT, field.Ff, field.DV, field.V, field.MaxLen, field.Kids
+    return (
+        _str(t) if t else None,
+        _intern(_str(ft)) if ft else "Unknown",
+        _intern(_str(ff)) if ff else "None",
+        _str(dv) if dv else "",
+        _str(v) if v else "",
+        _intern(_str(max_len)) if max_len else "No limit",
+        kids,
+    )
+
+def walk(root_fields, recursive=True, emit=None):
+    """
+    Collect a FieldNode per AcroForm field, depth-first in document order
+    
+    Kid dicts shared by several parents are read once; later parents get a
+    relocated copy of the node and the subtree is not walked again. emit,
+    when given, receives one progress row per field; per-field errors go
+    to emit as well (or are printed when there is no emit).
+    """
+    nodes = []
+    
+    # Push in reverse so fields pop in document order
+    stack = [(field, index, 0, "") for index, field in reversed(list(enumerate(root_fields)))]
+    
+    # id(field) -> FieldNode; the node holds the field so its id is not reused
+    seen = {}
+    
+    while stack:
+        field, index, level, parent_name = stack.pop()
+        
+        cached = seen.get(id(field))
+        if cached is not None:
+            if parent_name:
+                full_path = f"{parent_name}.{cached.field_name}"
+            else:
+                full_path = cached.field_name
+            nodes.append(cached._replace(index=index, level=level, parent_name=parent_name, full_path=full_path))
+            continue
+        
+        try:
+            name, field_type, field_flags, default_value, current_value, max_length, kids = pull_field_attrs(field)
+            n_kids = len(kids) if kids is not None else 0
+            
+            # Decode field name
+            if name is not None:
+                field_name = decode_unicode_field_name(name)
+            else:
+                field_name = f"unnamed_field_{len(nodes)}"
+            
+            # Build full field path
+            if parent_name:
+                full_path = f"{parent_name}.{field_name}"
+            else:
+                full_path = field_name
+            
+            node = FieldNode(field, index, level, parent_name, name, field_name, full_path,
+                             field_type, field_flags, default_value, current_value, max_length,
+                             kids, n_kids)
+            nodes.append(node)
+            seen[id(field)] = node
+            
+            if emit is not None:
+                indent = _INDENTS[level] if level < len(_INDENTS) else "  " * level
+                emit(_FIELD_ROW_FMT % (indent, full_path, field_type, n_kids))
+            
+            # Queue children one level down
+            if recursive and n_kids:
+                stack.extend((child, i, level + 1, full_path) for i, child in reversed(list(enumerate(kids))))
+            
+        except Exception as e:
+            message = f"⚠️ Error analyzing field at level {level}: {e}"
+            if emit is not None:
+                emit(message)
+            else:
+                print(message)
+    
+    return nodes
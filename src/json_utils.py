@@ -0,0 +1,66 @@
+"""
+Shared JSON input/output helpers for VA Form 21-0966 PDF scripts
+Uses orjson when installed, stdlib json otherwise
+"""
+
+import json
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _dumps(payload, pretty=True):
+    """Encode payload as JSON bytes - 2-space indented, or compact with no spaces"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(payload, option=option)
+    if pretty:
+        return json.dumps(payload, indent=2).encode('utf-8')
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+def read_json(input_path):
+    """Read a whole JSON file in one call and parse it from bytes"""
+    data = Path(input_path).read_bytes()
+    
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def write_json(payload, output_path, pretty=True):
+    """
+    Serialize payload in a single write (compact when pretty is False)
+    """
+    data = _dumps(payload, pretty)
+    
+    with open(output_path, 'wb') as f:
+        f.write(data)
+
+def write_json_records(records, output_path, pretty=True):
+    """
+    Stream a list of records as a JSON array, one record at a time
+    
+    Only the current record's encoding is held in memory instead of the
+    whole document; the 1 MiB buffer keeps the per-record writes cheap.
+    Output matches write_json(list(records), output_path, pretty).
+    """
+    if pretty:
+        open_item, next_item, close_array = b"\n  ", b",\n  ", b"\n]"
+    else:
+        open_item, next_item, close_array = b"", b",", b"]"
+    
+    with open(output_path, 'wb', buffering=1 << 20) as f:
+        f.write(b"[")
+        first = True
+        for record in records:
+            f.write(open_item if first else next_item)
+            data = _dumps(record, pretty)
+            if pretty:
+                # Nest the record one level deeper inside the array
+                data = data.replace(b"\n", b"\n  ")
+            f.write(data)
+            first = False
+        f.write(b"]" if first else close_array)
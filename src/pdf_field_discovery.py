@@ -6,8 +6,10 @@ Extracts internal field names, types, and properties from the blank PDF
 
 import sys
 import os
+from collections import defaultdict
 from pdfrw import PdfReader
-import json
+from field_walker import walk
+from json_utils import write_json_records
 
 def discover_pdf_fields(pdf_path):
     """
@@ -17,8 +19,9 @@ def discover_pdf_fields(pdf_path):
     print(f"📄 Analyzing: {pdf_path}")
     
     try:
-        # Read the PDF
-        pdf = PdfReader(pdf_path)
+        # Objects are resolved lazily on attribute access; keep streams compressed
+        # since only the /AcroForm subtree is read
+        pdf = PdfReader(pdf_path, decompress=False)
         print(f"✅ PDF loaded successfully - {len(pdf.pages)} pages")
         
         # Extract form fields
@@ -36,8 +39,8 @@ def discover_pdf_fields(pdf_path):
         print(f"📋 Found {len(form.Fields)} form fields")
         
         # Analyze each field
-        for i, field in enumerate(form.Fields):
-            field_info = analyze_field(field, i)
+        for node in walk(form.Fields, recursive=False):
+            field_info = analyze_field(node)
             if field_info:
                 fields_info.append(field_info)
                 
@@ -47,39 +50,48 @@ def discover_pdf_fields(pdf_path):
         print(f"❌ Error reading PDF: {e}")
         return None
 
-def analyze_field(field, index):
+def analyze_field(node):
     """
     Extract detailed information about a single field
     """
+    field = node.field
+    index = node.index
+    
     try:
+        field_type = node.field_type
+        kids = node.kids
+        rect = field.Rect
+        
         field_info = {
             "index": index,
-            "internal_name": str(field.T) if field.T else f"field_{index}",
-            "field_type": str(field.FT) if field.FT else "Unknown",
-            "field_flags": str(field.Ff) if field.Ff else "None",
-            "default_value": str(field.DV) if field.DV else "",
-            "current_value": str(field.V) if field.V else "",
-            "max_length": str(field.MaxLen) if field.MaxLen else "No limit",
-            "rect": str(field.Rect) if field.Rect else "No position",
+            "internal_name": node.name if node.name is not None else f"field_{index}",
+            "field_type": field_type,
+            "field_flags": node.field_flags,
+            "default_value": node.default_value,
+            "current_value": node.current_value,
+            "max_length": node.max_length,
+            "rect": str(rect) if rect else "No position",
             "page": "TBD"  # Will determine page later
         }
         
         # Special handling for checkboxes and radio buttons
-        if field.FT == '/Btn':  # Button field (checkbox/radio)
-            if field.Kids:  # Has children (radio button group)
+        if field_type == '/Btn':  # Button field (checkbox/radio)
+            if kids:  # Has children (radio button group)
                 field_info["button_type"] = "Radio Button Group"
                 field_info["options"] = []
-                for kid in field.Kids:
-                    if kid.AS:
-                        field_info["options"].append(str(kid.AS))
+                for kid in kids:
+                    state = kid.AS
+                    if state:
+                        field_info["options"].append(str(state))
             else:
                 field_info["button_type"] = "Checkbox"
                 
         # Special handling for choice fields (dropdowns, lists)
-        elif field.FT == '/Ch':  # Choice field
+        elif field_type == '/Ch':  # Choice field
             field_info["field_type"] = "Choice Field"
-            if field.Opt:
-                field_info["options"] = [str(opt) for opt in field.Opt]
+            options = field.Opt
+            if options:
+                field_info["options"] = [str(opt) for opt in options]
                 
         return field_info
         
@@ -87,13 +99,12 @@ def analyze_field(field, index):
         print(f"⚠️ Error analyzing field {index}: {e}")
         return None
 
-def save_field_mapping(fields_info, output_path):
+def save_field_mapping(fields_info, output_path, pretty=True):
     """
     Save field information to JSON file for future reference
     """
     try:
-        with open(output_path, 'w') as f:
-            json.dump(fields_info, f, indent=2)
+        write_json_records(fields_info, output_path, pretty)
         print(f"💾 Field mapping saved to: {output_path}")
         return True
     except Exception as e:
@@ -109,12 +120,9 @@ def print_field_summary(fields_info):
     print("="*60)
     
     # Group fields by type
-    field_types = {}
+    field_types = defaultdict(list)
     for field in fields_info:
-        ftype = field['field_type']
-        if ftype not in field_types:
-            field_types[ftype] = []
-        field_types[ftype].append(field)
+        field_types[field['field_type']].append(field)
     
     # Print summary by type
     for ftype, fields in field_types.items():
@@ -129,7 +137,8 @@ def print_field_summary(fields_info):
     print(f"\n📈 Total Fields Discovered: {len(fields_info)}")
     
     # Look for email-related fields
-    email_fields = [f for f in fields_info if 'email' in f['internal_name'].lower() or 'mail' in f['internal_name'].lower()]
+    names_lc = [f['internal_name'].lower() for f in fields_info]
+    email_fields = [f for f, name in zip(fields_info, names_lc) if 'email' in name or 'mail' in name]
     if email_fields:
         print(f"\n📧 Email Fields Found ({len(email_fields)}):")
         for field in email_fields:
@@ -148,11 +157,13 @@ def main():
     """
     # Check for PDF file argument
     if len(sys.argv) < 2:
-        print("Usage: python pdf_field_discovery.py <path_to_blank_pdf>")
+        print("Usage: python pdf_field_discovery.py <path_to_blank_pdf> [--compact]")
         print("Example: python pdf_field_discovery.py data/VA_Form_21-0966_blank.pdf")
         return
     
     pdf_path = sys.argv[1]
+    # Compact JSON (no indentation or spaces) for machine-consumed output
+    compact = "--compact" in sys.argv[2:]
     
     # Verify file exists
     if not os.path.exists(pdf_path):
@@ -168,7 +179,7 @@ def main():
         
         # Save to JSON
         output_path = "data/field_mapping.json"
-        save_field_mapping(fields_info, output_path)
+        save_field_mapping(fields_info, output_path, pretty=not compact)
         
         print(f"\n🎯 Next Steps:")
         print(f"1. Review the field mapping in {output_path}")
@@ -0,0 +1,31 @@
+"""
+Shared text helpers for VA Form 21-0966 PDF scripts
+Decodes raw pdfrw field names into readable strings
+"""
+
+import functools
+
+@functools.lru_cache(maxsize=4096)
+def decode_unicode_field_name(field_str):
+    """
+    Decode Unicode field names that appear as <FEFF...>
+    
+    Takes the raw str(field.T) so results can be cached - field names
+    repeat across a form (checkbox groups, section prefixes)
+    """
+    # Handle Unicode encoded field names
+    if field_str.startswith('<FEFF') and field_str.endswith('>'):
+        # Extract hex content
+        hex_content = field_str[5:-1]  # Remove <FEFF and >
+        
+        try:
+            # Hex digits -> UTF-16BE bytes -> text, all inside the C codecs
+            return bytes.fromhex(hex_content).decode('utf-16-be')
+        except ValueError:
+            return field_str
+    
+    # Handle regular parentheses format
+    if field_str.startswith('(') and field_str.endswith(')'):
+        return field_str[1:-1]
+    
+    return field_str
@@ -6,29 +6,175 @@ Uses discovered field patterns and values to fill the form programmatically
 
 import sys
 import os
-import json
+import re
+import logging
 from datetime import datetime
-from pdfrw import PdfReader, PdfWriter
+from pdfrw import PdfReader, PdfWriter, PdfName, PdfDict, PdfObject
+from field_walker import walk
+from pdf_text_utils import decode_unicode_field_name
+from json_utils import read_json
+
+try:
+    import jsonschema
+except ImportError:
+    jsonschema = None
+
+logger = logging.getLogger(__name__)
+
+# Minimum structure the filler needs from its JSON input
+_INPUT_SCHEMA = {
+    "type": "object",
+    "required": ["veteran_info"],
+    "properties": {
+        "veteran_info": {
+            "type": "object",
+            "required": ["first_name", "last_name", "date_of_birth"],
+        },
+    },
+}
+
+# Compiled once at import; None means validate_json_input checks by hand
+_INPUT_VALIDATOR = jsonschema.Draft7Validator(_INPUT_SCHEMA) if jsonschema is not None else None
+
+# Deletes the ASCII digits, leaving only a string's formatting characters
+_DIGITS_DELETE = str.maketrans('', '', '0123456789')
+
+# Deletes the dashes and spaces used to format an SSN
+_SSN_SEPARATORS_DELETE = str.maketrans('', '', '- ')
+
+# Well-formed inputs are validated and split in a single match; anything
+# else falls through to the lenient parsing below
+_SSN_RE = re.compile(r'([0-9]{3})[- ]?([0-9]{2})[- ]?([0-9]{4})')
+_DATE_RE = re.compile(r'([0-9]{1,2})([/-])([0-9]{1,2})\2([0-9]{4}|[0-9]{2})')
+
+# Runs of anything but letters and digits, stripped from output filenames
+_NON_ALNUM = re.compile(r'[\W_]+')
+
+# Two-digit years above the pivot are 19xx, the rest 20xx. strptime's %y
+# pivots at 69 instead, which would put a 1955 birth year in 2055
+_TWO_DIGIT_YEAR_PIVOT = 50
+
+def _expand_year(year):
+    """Apply the two-digit-year policy; other lengths pass through as given"""
+    if len(year) == 2:
+        return ("19" if int(year) > _TWO_DIGIT_YEAR_PIVOT else "20") + year
+    return year
+
+# pdfrw names compared or assigned for every button field
+_BTN_FT = PdfName.Btn
+_PDF_ON = PdfName('1')
+
+def _digits_only(text):
+    """Strip everything but ASCII digits in two C-level translate passes"""
+    return text.translate(str.maketrans('', '', text.translate(_DIGITS_DELETE)))
 
 class VAForm21_0966Filler:
     def __init__(self, blank_pdf_path):
         self.blank_pdf_path = blank_pdf_path
         self.pdf_reader = None
         self.pdf_writer = None
+        self._field_index = None  # Built on first fill, see fill_form
+        self._apply = None  # Fill loop bound to the index, see _compile_filler
         
     def load_blank_form(self):
         """Load the blank PDF form"""
         try:
             self.pdf_reader = PdfReader(self.blank_pdf_path)
+            
+            # Ask viewers to rebuild field appearances once for the whole form,
+            # since pdfrw only sets values and never regenerates the streams
+            acroform = self.pdf_reader.Root.AcroForm
+            if acroform is not None:
+                acroform.update(PdfDict(NeedAppearances=PdfObject('true')))
+            
+            # A freshly loaded form gets a fresh index on its next fill
+            self._field_index = None
+            self._apply = None
             print(f"✅ Loaded blank form: {self.blank_pdf_path}")
             return True
         except Exception as e:
             print(f"❌ Error loading blank form: {e}")
             return False
     
+    def _build_field_index(self, root_fields):
+        """Map every full field path to its pdfrw field in a single traversal"""
+        self._field_index = {}
+        
+        if root_fields is None:
+            return
+        
+        for node in walk(root_fields):
+            # First match in document order wins, as with the recursive search
+            self._field_index.setdefault(node.full_path, node.field)
+    
+    def _compile_filler(self):
+        """
+        Build the fill loop once per loaded form, with the index lookup and
+        value setter pre-resolved into locals so each field costs one call
+        """
+        lookup = self._field_index.get
+        set_value = self.set_field_value
+        
+        def apply(field_mapping):
+            filled_count = 0
+            failed_count = 0
+            log_filled = logger.isEnabledFor(logging.DEBUG)
+            
+            for field_name, field_value in field_mapping.items():
+                field = lookup(field_name)
+                if field is None:
+                    logger.warning(f"⚠️ Field not found: {field_name}")
+                    failed_count += 1
+                    continue
+                
+                try:
+                    set_value(field, field_value)
+                except Exception as e:
+                    logger.error(f"❌ Failed to fill {field_name}: {e}")
+                    failed_count += 1
+                    continue
+                
+                if log_filled:
+                    logger.debug(f"✅ {field_name}: '{field_value}'")
+                filled_count += 1
+            
+            return filled_count, failed_count
+        
+        return apply
+    
     def validate_json_input(self, data):
         """Validate the JSON input structure"""
-        required_fields = ['veteran_info']
+        if _INPUT_VALIDATOR is None:
+            return self._validate_json_input_manually(data)
+        
+        # Top-level problems sort ahead of the veteran_info ones
+        errors = sorted(_INPUT_VALIDATOR.iter_errors(data), key=lambda e: list(e.path))
+        reported_paths = set()
+        
+        for error in errors:
+            if error.validator == 'required':
+                # jsonschema raises one error per missing key; report each object once
+                path = tuple(error.path)
+                if path in reported_paths:
+                    continue
+                reported_paths.add(path)
+                
+                label = "required veteran field" if path else "required field"
+                for field in error.validator_value:
+                    if field not in error.instance:
+                        print(f"❌ Missing {label}: {field}")
+            else:
+                print(f"❌ Invalid JSON input: {error.message}")
+        
+        if errors:
+            return False
+        
+        print("✅ JSON input validation passed")
+        return True
+    
+    def _validate_json_input_manually(self, data):
+        """Check the same required fields as _INPUT_SCHEMA without jsonschema"""
+        required_fields = _INPUT_SCHEMA['required']
         
         for field in required_fields:
             if field not in data:
@@ -37,7 +183,7 @@ class VAForm21_0966Filler:
         
         # Check veteran info
         veteran_info = data['veteran_info']
-        required_veteran_fields = ['first_name', 'last_name', 'date_of_birth']
+        required_veteran_fields = _INPUT_SCHEMA['properties']['veteran_info']['required']
         
         for field in required_veteran_fields:
             if field not in veteran_info:
@@ -53,22 +199,17 @@ class VAForm21_0966Filler:
         EMAIL_ADDRESS[1] gets first 20 chars
         EMAIL_ADDRESS[0] gets remaining chars
         """
-        if not email:
-            return "", ""
-            
-        if len(email) <= 20:
-            # Short email goes in field [1], field [0] stays empty
-            return "", email
-        else:
-            # Split: first 20 chars in [1], remainder in [0] 
-            email_part_1 = email[:20]  # First 20 chars
-            email_part_0 = email[20:]  # Remaining chars
-            return email_part_0, email_part_1
+        # Slicing covers every case: short and empty emails leave [0] empty
+        return email[20:], email[:20]
     
     def split_ssn(self, ssn):
         """Split SSN into three parts (XXX-XX-XXXX)"""
-        # Remove any existing dashes
-        clean_ssn = ssn.replace('-', '').replace(' ', '')
+        match = _SSN_RE.fullmatch(ssn)
+        if match:
+            return match.groups()
+        
+        # Remove any existing dashes and spaces in one pass
+        clean_ssn = ssn.translate(_SSN_SEPARATORS_DELETE)
         
         if len(clean_ssn) != 9:
             print(f"⚠️ Warning: SSN should be 9 digits, got {len(clean_ssn)}")
@@ -79,7 +220,7 @@ class VAForm21_0966Filler:
     def split_phone(self, phone):
         """Split phone into three parts (XXX-XXX-XXXX)"""
         # Remove any formatting
-        clean_phone = ''.join(filter(str.isdigit, phone))
+        clean_phone = _digits_only(phone)
         
         if len(clean_phone) != 10:
             print(f"⚠️ Warning: Phone should be 10 digits, got {len(clean_phone)}")
@@ -91,24 +232,27 @@ class VAForm21_0966Filler:
     def split_date(self, date_str):
         """Split date into MM, DD, YYYY components"""
         try:
+            # Well-formed dates are validated and split in one match
+            match = _DATE_RE.fullmatch(date_str)
+            if match:
+                month, _, day, year = match.groups()
+                return month.zfill(2), day.zfill(2), _expand_year(year)
+            
             # Handle various date formats
             if '/' in date_str:
-                parts = date_str.split('/')
+                sep = '/'
             elif '-' in date_str:
-                parts = date_str.split('-')
+                sep = '-'
             else:
                 print(f"⚠️ Warning: Unrecognized date format: {date_str}")
                 return "01", "01", "1970"
             
-            if len(parts) == 3:
-                month, day, year = parts
+            if date_str.count(sep) == 2:
+                # Two partitions give the three parts without building a list
+                month, _, rest = date_str.partition(sep)
+                day, _, year = rest.partition(sep)
                 # Ensure 2-digit month and day, 4-digit year
-                month = month.zfill(2)
-                day = day.zfill(2)
-                if len(year) == 2:
-                    year = "19" + year if int(year) > 50 else "20" + year
-                
-                return month, day, year
+                return month.zfill(2), day.zfill(2), _expand_year(year)
             else:
                 print(f"⚠️ Warning: Invalid date format: {date_str}")
                 return "01", "01", "1970"
@@ -119,7 +263,7 @@ class VAForm21_0966Filler:
     
     def split_zip(self, zip_code):
         """Split ZIP code into 5+4 format"""
-        clean_zip = ''.join(filter(str.isdigit, zip_code))
+        clean_zip = _digits_only(zip_code)
         
         if len(clean_zip) >= 5:
             zip_5 = clean_zip[:5]
@@ -132,12 +276,14 @@ class VAForm21_0966Filler:
     def create_field_mapping(self, data):
         """Create the complete field mapping from JSON data"""
         
+        # Fetch each nested section once; "or {}" also covers explicit nulls
         veteran_info = data['veteran_info']
-        benefit_election = data.get('benefit_election', {})
-        signature_info = data.get('signature_info', {})
+        address = veteran_info.get('address') or {}
+        benefit_election = data.get('benefit_election') or {}
+        signature_info = data.get('signature_info') or {}
         
         # Handle email overflow
-        email = veteran_info.get('email', '')
+        email = veteran_info.get('email') or ''
         email_0, email_1 = self.handle_email_overflow(email)
         
         # Handle SSN split
@@ -155,7 +301,7 @@ class VAForm21_0966Filler:
             phone_1, phone_2, phone_3 = "", "", ""
         
         # Handle date of birth
-        dob = veteran_info.get('date_of_birth', '')
+        dob = veteran_info['date_of_birth']  # Required by validate_json_input
         if dob:
             dob_month, dob_day, dob_year = self.split_date(dob)
         else:
@@ -167,11 +313,7 @@ class VAForm21_0966Filler:
             sig_month, sig_day, sig_year = self.split_date(sig_date)
         else:
             # Use today's date if not provided
-            today = datetime.now()
-            sig_month, sig_day, sig_year = f"{today.month:02d}", f"{today.day:02d}", str(today.year)
-        
-        # Handle address
-        address = veteran_info.get('address', {})
+            sig_month, sig_day, sig_year = datetime.now().strftime('%m %d %Y').split()
         
         # Handle ZIP code split
         zip_code = address.get('zip_code', '')
@@ -183,9 +325,9 @@ class VAForm21_0966Filler:
         # Create complete field mapping using discovered field names
         field_mapping = {
             # Veteran Name Fields
-            "F[0].Page_1[0].Veterans_First_Name[0]": veteran_info.get('first_name', ''),
+            "F[0].Page_1[0].Veterans_First_Name[0]": veteran_info['first_name'],
             "F[0].Page_1[0].Veterans_Middle_Initial1[0]": veteran_info.get('middle_initial', ''),
-            "F[0].Page_1[0].Veterans_Last_Name[0]": veteran_info.get('last_name', ''),
+            "F[0].Page_1[0].Veterans_Last_Name[0]": veteran_info['last_name'],
             
             # SSN Fields (split into 3 parts)
             "F[0].Page_1[0].Veterans_Social_SecurityNumber_FirstThreeNumbers[0]": ssn_1,
@@ -245,37 +387,28 @@ class VAForm21_0966Filler:
         # NOTE: We deliberately DO NOT add "/Off" values for unchecked boxes
         # This should leave them in their default unchecked state
         
-        return field_mapping
+        # Drop unset optional fields here so fill_form only walks real values
+        return {name: value for name, value in field_mapping.items() if value}
     
     def fill_form(self, field_mapping):
         """Fill the PDF form with the mapped values using correct pdfrw syntax"""
         try:
-            # Fill form fields using pdfrw method
-            filled_count = 0
-            failed_count = 0
-            
             print("\n🔧 Filling form fields...")
             
-            # Get the form object
-            if self.pdf_reader.Root.AcroForm is None:
+            # Get the form object once; its field tree is walked at most once
+            # per loaded form, however many times fill_form runs
+            acroform = self.pdf_reader.Root.AcroForm
+            if acroform is None:
                 print("❌ No AcroForm found in PDF")
                 return False
+            
+            if self._apply is None:
+                self._build_field_index(acroform.Fields)
+                self._apply = self._compile_filler()
                 
-            # Fill fields using pdfrw's method
-            for field_name, field_value in field_mapping.items():
-                if field_value:  # Only fill non-empty values
-                    try:
-                        # Find the field in the form
-                        field_found = self.find_and_fill_field(self.pdf_reader.Root.AcroForm.Fields, field_name, field_value)
-                        if field_found:
-                            print(f"✅ {field_name}: '{field_value}'")
-                            filled_count += 1
-                        else:
-                            print(f"⚠️ Field not found: {field_name}")
-                            failed_count += 1
-                    except Exception as e:
-                        print(f"❌ Failed to fill {field_name}: {e}")
-                        failed_count += 1
+            # Fill form fields using pdfrw method
+            # (create_field_mapping has already dropped the empty values)
+            filled_count, failed_count = self._apply(field_mapping)
             
             print(f"\n📊 Form filling summary:")
             print(f"✅ Successfully filled: {filled_count} fields")
@@ -287,85 +420,72 @@ class VAForm21_0966Filler:
             print(f"❌ Error filling form: {e}")
             return False
     
+    def set_field_value(self, field, value):
+        """Set a field's value - FIXED FORMATTING"""
+        if field.FT == _BTN_FT:  # Button/Checkbox field
+            # For checkboxes, use the discovered working values. /AS still has to
+            # match /V, as most viewers pick the checkbox's on/off appearance from
+            # it rather than regenerating it, so one name serves both
+            if value == "/1":
+                state = _PDF_ON
+            else:
+                state = PdfName(value.replace('/', ''))  # Remove leading slash
+            field.V = state
+            field.AS = state
+        else:  # Text field - REMOVE PARENTHESES!
+            field.V = value  # No more f"({value})"!
+    
     def find_and_fill_field(self, fields, target_field_name, value, parent_path=""):
-        """Recursively find and fill the target field - FIXED VERSION"""
-        from pdfrw import PdfName
-        
+        """Recursively find and fill the target field (fallback when no index is built)"""
+        try:
+            return self._find_and_fill_field(fields, target_field_name, value, parent_path)
+        except Exception as e:
+            logger.error(f"❌ Failed to fill {target_field_name}: {e}")
+            return False
+    
+    def _find_and_fill_field(self, fields, target_field_name, value, parent_path):
+        """Search body for find_and_fill_field; unnamed fields are skipped explicitly"""
         for field in fields:
-            try:
-                # Decode field name
-                if field.T:
-                    field_name = self.decode_unicode_field_name(field.T)
-                else:
-                    continue
-                
-                # Build full path
-                if parent_path:
-                    full_path = f"{parent_path}.{field_name}"
-                else:
-                    full_path = field_name
-                
-                # Check if this is our target field
-                if full_path == target_field_name:
-                    # Set the field value - FIXED FORMATTING
-                    if field.FT == PdfName.Btn:  # Button/Checkbox field
-                        # For checkboxes, use the discovered working values
-                        field.V = PdfName(value.replace('/', ''))  # Remove leading slash
-                        field.AS = PdfName(value.replace('/', ''))
-                    else:  # Text field - REMOVE PARENTHESES!
-                        field.V = value  # No more f"({value})"!
-                    return True
-                
-                # Recursively search children
-                if field.Kids:
-                    found = self.find_and_fill_field(field.Kids, target_field_name, value, full_path)
-                    if found:
-                        return True
-                        
-            except Exception as e:
+            # Decode field name
+            t = field.T
+            if not t:
                 continue
+            field_name = self.decode_unicode_field_name(t)
+            
+            # Build full path
+            full_path = f"{parent_path}.{field_name}" if parent_path else field_name
+            
+            # Check if this is our target field
+            if full_path == target_field_name:
+                self.set_field_value(field, value)
+                return True
+            
+            # Recursively search children
+            kids = field.Kids
+            if kids and self._find_and_fill_field(kids, target_field_name, value, full_path):
+                return True
                 
         return False
     
     def decode_unicode_field_name(self, field_name_obj):
         """Decode Unicode field names"""
-        field_str = str(field_name_obj)
-        
-        if field_str.startswith('<FEFF') and field_str.endswith('>'):
-            hex_content = field_str[5:-1]
-            try:
-                decoded = ""
-                for i in range(0, len(hex_content), 4):
-                    hex_char = hex_content[i:i+4]
-                    char_code = int(hex_char, 16)
-                    decoded += chr(char_code)
-                return decoded
-            except:
-                return field_str
-        
-        if field_str.startswith('(') and field_str.endswith(')'):
-            return field_str[1:-1]
-        
-        return field_str
+        return decode_unicode_field_name(str(field_name_obj))
     
     def save_filled_form(self, output_path):
         """Save the filled form to specified path using pdfrw"""
         try:
-            # Use PdfWriter to save the modified form
-            self.pdf_writer = PdfWriter()
+            # Serialize the reader's own trailer in one pass, which keeps the
+            # /AcroForm dictionary that a page-by-page copy would drop
+            self.pdf_writer = PdfWriter(trailer=self.pdf_reader)
             
-            # Add all pages from the modified reader
-            for page in self.pdf_reader.pages:
-                self.pdf_writer.addPage(page)
-            
-            # Write to file
-            with open(output_path, 'wb') as output_file:
+            # pdfrw emits many small writes; a 1 MiB buffer batches them
+            with open(os.fspath(output_path), 'wb', buffering=1 << 20) as output_file:
                 self.pdf_writer.write(output_file)
-                
-            print(f"💾 Filled form saved to: {output_path}")
+            
+            logger.info(f"💾 Filled form saved to: {output_path}")
             return True
         except Exception as e:
-            print(f"❌ Error saving form: {e}")
+            logger.error(f"❌ Error saving form: {e}")
             return False
     
     def generate_output_filename(self, data):
@@ -375,16 +495,15 @@ class VAForm21_0966Filler:
         last_name = veteran_info.get('last_name', 'Veteran')
         
         # Clean names for filename
-        clean_first = ''.join(c for c in first_name if c.isalnum())
-        clean_last = ''.join(c for c in last_name if c.isalnum())
+        clean_first = _NON_ALNUM.sub('', first_name)
+        clean_last = _NON_ALNUM.sub('', last_name)
         
         return f"VA_Form_21-0966_{clean_first}{clean_last}.pdf"
 
 def load_json_input(json_path):
     """Load and parse JSON input file"""
     try:
-        with open(json_path, 'r') as f:
-            data = json.load(f)
+        data = read_json(json_path)
         print(f"✅ Loaded JSON input: {json_path}")
         return data
     except Exception as e:
@@ -394,13 +513,18 @@ def load_json_input(json_path):
 def main():
     """Main function"""
     if len(sys.argv) < 3:
-        print("Usage: python va_form_filler_complete.py <blank_pdf> <json_input>")
+        print("Usage: python va_form_filler_complete.py <blank_pdf> <json_input> [--verbose]")
         print("Example: python va_form_filler_complete.py data/VA_Form_21-0966_blank.pdf data/test_data.json")
         return
     
     blank_pdf_path = sys.argv[1]
     json_input_path = sys.argv[2]
     
+    # Per-field fill messages are DEBUG; only problems show by default
+    verbose = "--verbose" in sys.argv[3:]
+    logging.basicConfig(level=logging.DEBUG if verbose else logging.WARNING,
+                        format="%(message)s", stream=sys.stdout)
+    
     # Verify files exist
     if not os.path.exists(blank_pdf_path):
         print(f"❌ Blank PDF not found: {blank_pdf_path}")